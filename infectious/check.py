@@ -3,17 +3,21 @@ import alternative_graph
 print(nx.les_miserables_graph)
 print(nx.karate_club_graph)
 import networkx as nx
-import random
 
 
 import networkx as nx
-import random
+import numpy as np
 import matplotlib.pyplot as plt
 
 
 def random_social_graph():
-    """Create a random graph representing social relationships."""
-    random.seed(20)
+    """Create a random graph representing social relationships.
+
+    Returns the graph together with its weighted adjacency in CSR form as
+    (indptr, indices, data), where the neighbors of node u are
+    indices[indptr[u]:indptr[u + 1]] with edge weights data[indptr[u]:indptr[u + 1]].
+    """
+    rng = np.random.default_rng(20)
 
     G = nx.Graph()
 
@@ -23,22 +27,29 @@ def random_social_graph():
 
     # Add 80 edges with random weights
     num_edges = 80
-    while len(G.edges) < num_edges:
-        # Randomly select two nodes
-        u = random.randint(0, num_nodes - 1)
-        v = random.randint(0, num_nodes - 1)
+    pairs = np.empty((0, 2), dtype=np.int64)
+    while len(pairs) < num_edges:
+        # Draw candidate edges in bulk, dropping self-loops
+        cand = rng.integers(0, num_nodes, size=(num_edges * 3, 2))
+        cand = cand[cand[:, 0] != cand[:, 1]]
+        # Undirected, so (u, v) and (v, u) are the same edge
+        pairs = np.concatenate((pairs, np.sort(cand, axis=1)))
+        # Keep the first occurrence of each edge, in the order it was drawn
+        _, first = np.unique(pairs, axis=0, return_index=True)
+        pairs = pairs[np.sort(first)]
+    pairs = pairs[:num_edges]
 
-        # Ensure that the edge does not already exist
-        if u != v and not G.has_edge(u, v):
-            weight = random.randint(1, 10)  # Random weight between 1 and 10
-            G.add_edge(u, v, weight=weight)
+    weights = rng.integers(1, 11, size=num_edges)  # Random weight between 1 and 10
+    G.add_weighted_edges_from(
+        zip(pairs[:, 0].tolist(), pairs[:, 1].tolist(), weights.tolist()))
 
-    return G
+    A = nx.to_scipy_sparse_array(G, format='csr', weight='weight')
+    return G, (A.indptr, A.indices, A.data)
 
 
 # Create the graph with a fixed seed for reproducibility
 seed_value = 42  # You can change this to any integer
-G = random_social_graph()
+G, (indptr, indices, data) = random_social_graph()
 
 # Draw the graph
 plt.figure(figsize=(10, 10))
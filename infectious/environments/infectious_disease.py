@@ -28,7 +28,7 @@ from __future__ import division
 from __future__ import print_function
 
 import copy
-from typing import Dict, List, Optional, Text
+from typing import Dict, List, Optional, Text, Tuple
 
 import attr
 import gin
@@ -214,6 +214,9 @@ class InfectiousDiseaseEnv(core.FairnessEnv):
         state: i for i, state in enumerate(params.state_names)}
 
     super(InfectiousDiseaseEnv, self).__init__(params)
+    # CSR adjacency of the contact graph, see `_get_adjacency`.
+    self._adjacency_graph = None  # type: Optional[nx.Graph]
+    self._adjacency = None  # type: Optional[Tuple[np.ndarray, np.ndarray]]
     self.state = self._create_initial_state()
 
   def _create_initial_state(self, rng=None):
@@ -263,6 +266,23 @@ class InfectiousDiseaseEnv(core.FairnessEnv):
 
     return observable_state
 
+  def _get_adjacency(self, population_graph):
+    """Returns the contact graph in CSR form as (indptr, indices) arrays.
+    The neighbors of individual i are indices[indptr[i]:indptr[i + 1]]. The
+    arrays are cached for as long as the state refers to the same graph object.
+    Args:
+      population_graph: An `nx.Graph` whose nodes are 0..population_size - 1.
+    """
+    if population_graph is not self._adjacency_graph:
+      adjacency = nx.to_scipy_sparse_array(
+          population_graph,
+          nodelist=range(population_graph.number_of_nodes()),
+          weight=None,
+          format='csr')
+      self._adjacency = (adjacency.indptr, adjacency.indices)
+      self._adjacency_graph = population_graph
+    return self._adjacency
+
   def _step_impl(self, state, action):
     """Moves forward one timestep.
     First, the agent allocates treatment.
@@ -293,6 +313,9 @@ class InfectiousDiseaseEnv(core.FairnessEnv):
           len(params.state_names), p=transition_probs)
 
     # Progress disease by tracking state transitions then applying them.
+    indptr, indices = self._get_adjacency(state.population_graph)
+    is_infectious = (
+        np.asarray(state.health_states) == state.params.infectious_index)
     transitions = []  # Tracks new states.
     for index, health_state in enumerate(state.health_states):
       transition_probs = state.params.transition_matrix[health_state, :]
@@ -300,9 +323,8 @@ class InfectiousDiseaseEnv(core.FairnessEnv):
       # Handle transitions from the healthy state as a special case.  See the
       # class-level docstring for a description of this process.
       if health_state == state.params.healthy_index:
-        num_infected_neighbors = sum(
-            state.health_states[neighbor] == state.params.infectious_index
-            for neighbor in state.population_graph.neighbors(index))
+        num_infected_neighbors = int(
+            is_infectious[indices[indptr[index]:indptr[index + 1]]].sum())
 
         transition_probs = np.zeros(len(state.params.state_names))
         transition_probs[state.params.healthy_index] = (
@@ -140,9 +140,12 @@ def to_json(dictionary, sort_keys=True, **kw):
   return json.dumps(dictionary, cls=GymEncoder, sort_keys=sort_keys, **kw)
 
 
-@attr.s(cmp=False)
+@attr.s(cmp=False, slots=True)
 class State(object):
-  """Simple mutable storage class for state variables."""
+  """Simple mutable storage class for state variables.
+  Slotted so that subclasses declaring `slots=True` store their attributes in
+  slots rather than a per-instance __dict__.
+  """
 
   asdict = attr.asdict
 
@@ -311,8 +314,9 @@ class FairnessEnv(gym.Env):
     self.state = self._step_impl(self.state, action)
     observation = self._get_observable_state()
 
-    logging.debug('Observation: %s.', observation)
-    logging.debug('Observation space: %s.', self.observation_space)
+    if logging.level_debug():
+      logging.debug('Observation: %s.', observation)
+      logging.debug('Observation space: %s.', self.observation_space)
 
     assert self.observation_space.contains(
         observation
@@ -29,12 +29,17 @@ from typing import Sequence
 class Distribution(object):
   """Base distribution class.
   Inheriting classes should fill in the sample method and initialize dim.
+  They may also fill in sample_batch, which draws n samples at once and returns
+  them stacked along a new leading axis.
   """
   dim = attr.ib(init=False)
 
   def sample(self, rng):
     raise NotImplementedError
 
+  def sample_batch(self, rng, n):
+    raise NotImplementedError
+
 
 def _check_sum_to_one(instance, attribute, value):
   """Raises ValueError if the value does not sum to one."""
@@ -69,11 +74,29 @@ class Mixture(Distribution):
                                _check_nonnegative])  # type: Sequence[float]
 
   def sample(self, rng):
-    logging.debug("Sampling from a mixture with %d components. Weights: %s",
-                  len(self.components), self.weights)
+    if logging.level_debug():
+      logging.debug("Sampling from a mixture with %d components. Weights: %s",
+                    len(self.components), self.weights)
     component = rng.choice(self.components, p=self.weights)
     return component.sample(rng)
 
+  def sample_batch(self, rng, n):
+    """Draws n samples, sampling each component once for all of its rows.
+    If components return tuples of arrays, a tuple of arrays is returned.
+    """
+    component_ids = rng.choice(len(self.components), size=n, p=self.weights)
+    counts = np.bincount(component_ids, minlength=len(self.components))
+    parts = [
+        component.sample_batch(rng, count)
+        for component, count in zip(self.components, counts)
+    ]
+    # Samples come back grouped by component. Scatter them back to the order in
+    # which components were drawn so that rows remain i.i.d.
+    order = np.argsort(component_ids, kind="stable")
+    if isinstance(parts[0], tuple):
+      return tuple(_scatter(values, order) for values in zip(*parts))
+    return _scatter(parts, order)
+
   def __attrs_post_init__(self):
     for component in self.components:
       if component.dim != self.components[0].dim:
@@ -81,6 +104,14 @@ class Mixture(Distribution):
     self.dim = self.components[0].dim
 
 
+def _scatter(parts, order):
+  """Concatenates parts and moves row i of the result to row order[i]."""
+  sorted_values = np.concatenate(parts)
+  values = np.empty_like(sorted_values)
+  values[order] = sorted_values
+  return values
+
+
 @attr.s
 class Gaussian(Distribution):
   """A Gaussian Distribution."""
@@ -93,6 +124,9 @@ class Gaussian(Distribution):
   def sample(self, rng):
     return rng.normal(self.mean, self.std)
 
+  def sample_batch(self, rng, n):
+    return rng.normal(self.mean, self.std, size=(n, self.dim))
+
 
 @attr.s
 class Bernoulli(Distribution):
@@ -106,6 +140,9 @@ class Bernoulli(Distribution):
   def sample(self, rng):
     return rng.random() < self.p
 
+  def sample_batch(self, rng, n):
+    return rng.random(n) < self.p
+
 
 @attr.s
 class Constant(Distribution):
@@ -118,4 +155,8 @@ class Constant(Distribution):
 
   def sample(self, rng):
     del rng  # Unused.
-    return self.mean
\ No newline at end of file
+    return self.mean
+
+  def sample_batch(self, rng, n):
+    del rng  # Unused.
+    return np.tile(np.asarray(self.mean), (n, 1))
@@ -23,7 +23,7 @@ from __future__ import print_function
 
 import attr
 import numpy as np
-from typing import Callable, Sequence
+from typing import Callable, Optional, Sequence
 
 from lending.environments import core, distributions
 
@@ -34,6 +34,8 @@ class Applicant(object):
   features = attr.ib()  # type: np.ndarray
   group = attr.ib()  # type: Sequence[int]
   will_default = attr.ib()  # type: bool
+  # Index of the nonzero entry of group, if the sampler knows it.
+  group_idx = attr.ib(default=None)  # type: Optional[int]
 
   def __attrs_post_init__(self):
     self.dim = len(self.features)
@@ -45,15 +47,29 @@ class ApplicantDistribution(distributions.Distribution):
   features = attr.ib()  #  type: distributions.Distribution
   group_membership = attr.ib()  #  type: distributions.Distribution
   will_default = attr.ib()  #  type: distributions.Distribution
+  # Group index shared by every sample, if group membership is constant.
+  group_idx = attr.ib(init=False)  #  type: Optional[int]
 
   def __attrs_post_init__(self):
     self.dim = self.features.dim
+    # Group membership is usually constant, in which case the group index of
+    # every sample is known up front.
+    self.group_idx = None
+    if isinstance(self.group_membership, distributions.Constant):
+      self.group_idx = int(np.argmax(self.group_membership.mean))
 
   def sample(self, rng):
     return Applicant(
         features=self.features.sample(rng),
         group=self.group_membership.sample(rng),
-        will_default=self.will_default.sample(rng))
+        will_default=self.will_default.sample(rng),
+        group_idx=self.group_idx)
+
+  def sample_batch(self, rng, n):
+    """Returns (features, group, will_default) arrays for n applicants."""
+    return (self.features.sample_batch(rng, n),
+            self.group_membership.sample_batch(rng, n),
+            self.will_default.sample_batch(rng, n))
 
 
 def _rotate(x, degrees):
@@ -0,0 +1,360 @@
+"""Vectorized versions of the lending environments.
+`SharedMemoryVecEnv` steps arbitrary environments in worker processes. Each
+worker process owns one environment. Actions and observations are exchanged
+through shared-memory arrays rather than pickled over pipes, and the parent and
+workers synchronize on a pair of barriers, so a step of all environments costs
+two barrier waits plus whatever the slowest environment takes.
+`VecLendingEnv` instead holds the state of many stationary lending
+environments in arrays and steps them all in one process with numpy.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+from multiprocessing import shared_memory
+import numbers
+import threading
+from typing import Dict, List, Optional, Text
+
+import gym
+from gym import spaces
+from gym.utils import seeding
+import numpy as np
+
+from lending.environments import lending_params
+from lending.environments.lending import LoanDecision
+from lending.environments.lending import _clip_batch
+from lending.environments.lending import _observable_state_vars
+
+# Commands written by the parent to the shared command slot.
+_STEP = 0
+_RESET = 1
+_CLOSE = 2
+
+
+class _SharedArray(object):
+  """A numpy array backed by a `shared_memory.SharedMemory` block."""
+
+  def __init__(self, shape, dtype):
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    self.shm = shared_memory.SharedMemory(create=True, size=size)
+    self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+    self.array.fill(0)
+
+  def release(self):
+    # Drop the view before closing so the buffer has no exported pointers.
+    del self.array
+    self.shm.close()
+    self.shm.unlink()
+
+
+class SharedMemoryVecEnv(gym.vector.VectorEnv):
+  """Runs several fairness environments in parallel in forked worker processes.
+  Intended for lending environments, whose observations are a dict of
+  fixed-shape arrays, but works for any environment with that property.
+  Sub-environments are reset automatically when they are done. The observation
+  returned for a sub-environment on the step it finishes is the first
+  observation of its next episode; its last observation and info are reported
+  in `infos['final_observation']` and `infos['final_info']`, as in gym's own
+  vector environments. The per-environment infos are sent over a pipe, and
+  only by workers that have a non-empty info or a finished episode to report.
+  """
+
+  def __init__(self, env_fns, timeout=60.):
+    """Initializes the workers.
+    Workers are forked so that they inherit the shared arrays and barriers
+    without having to reattach to them. This requires a platform that supports
+    the 'fork' start method.
+    Args:
+      env_fns: Callables that each build one environment. Called in the worker
+        processes, and the first one is also called once in this process to
+        discover the observation layout.
+      timeout: Seconds to wait for the workers to finish a command before
+        giving up on them, or None to wait indefinitely.
+    """
+    self._timeout = timeout
+    reference_env = env_fns[0]()
+    reference_obs = reference_env.reset()
+    super(SharedMemoryVecEnv, self).__init__(
+        num_envs=len(env_fns),
+        observation_space=reference_env.observation_space,
+        action_space=reference_env.action_space)
+    # Use the dtypes the environment actually produces so that observations
+    # match those of a single environment.
+    self._obs_layout = {
+        key: (np.shape(value), np.asarray(value).dtype)
+        for key, value in reference_obs.items()
+    }  # type: Dict[Text, tuple]
+    reference_env.close()
+    del reference_env
+
+    n = self.num_envs
+    self._shared = {
+        key: _SharedArray((n,) + shape, dtype)
+        for key, (shape, dtype) in self._obs_layout.items()
+    }  # type: Dict[Text, _SharedArray]
+    self._actions = _SharedArray((n,), np.int64)
+    self._seeds = _SharedArray((n,), np.int64)
+    self._has_seed = _SharedArray((n,), np.bool_)
+    self._rewards = _SharedArray((n,), np.float64)
+    self._dones = _SharedArray((n,), np.bool_)
+    self._has_info = _SharedArray((n,), np.bool_)
+    self._command = _SharedArray((1,), np.int64)
+
+    ctx = multiprocessing.get_context('fork')
+    # Parties are the workers plus this process.
+    self._start = ctx.Barrier(n + 1)
+    self._finish = ctx.Barrier(n + 1)
+    self._processes = []  # type: List[multiprocessing.Process]
+    self._info_pipes = []  # type: List[multiprocessing.connection.Connection]
+    for index, env_fn in enumerate(env_fns):
+      receiver, sender = ctx.Pipe(duplex=False)
+      process = ctx.Process(
+          target=self._worker, args=(index, env_fn, sender), daemon=True)
+      process.start()
+      sender.close()
+      self._info_pipes.append(receiver)
+      self._processes.append(process)
+
+  def _worker(self, index, env_fn, info_pipe):
+    """Worker loop: wait for a command, run it, publish the results."""
+    env = None
+    try:
+      env = env_fn()
+      while True:
+        self._start.wait()
+        command = self._command.array[0]
+        if command == _CLOSE:
+          break
+        if command == _RESET:
+          if self._has_seed.array[index]:
+            env.seed(int(self._seeds.array[index]))
+          observation = env.reset()
+          reward, done, info = 0., False, {}
+        else:
+          observation, reward, done, info = env.step(
+              self._actions.array[index])
+          if done:
+            info = {'final_observation': observation, 'final_info': info}
+            observation = env.reset()
+        for key, value in observation.items():
+          self._shared[key].array[index] = value
+        self._rewards.array[index] = reward
+        self._dones.array[index] = done
+        self._has_info.array[index] = bool(info)
+        self._finish.wait()
+        # Sent after the barrier, while the parent is reading, so that a large
+        # info cannot fill the pipe while the parent waits on the barrier.
+        if info:
+          info_pipe.send(info)
+    except threading.BrokenBarrierError:
+      pass  # The parent or another worker failed; nothing left to do.
+    except BaseException:
+      # Wake everyone up instead of leaving them waiting on this worker.
+      self._start.abort()
+      self._finish.abort()
+      raise
+    finally:
+      if env is not None:
+        env.close()
+
+  def _run(self, command):
+    """Runs `command` in every worker and waits for all of them to finish."""
+    # A worker killed while waiting on the start barrier still counts as
+    # arrived, and releasing the barrier would then block forever waiting for
+    # it to wake up, so dead workers are detected before entering it.
+    self._check_workers()
+    self._command.array[0] = command
+    self._wait(self._start)
+    self._wait(self._finish)
+
+  def _check_workers(self):
+    """Raises a RuntimeError if any worker process has exited."""
+    dead = [
+        index for index, process in enumerate(self._processes)
+        if not process.is_alive()
+    ]
+    if dead:
+      raise RuntimeError('Worker processes %s exited.' % dead)
+
+  def _wait(self, barrier):
+    """Waits on `barrier`, raising instead of hanging if a worker is gone."""
+    try:
+      barrier.wait(timeout=self._timeout)
+    except threading.BrokenBarrierError:
+      self._check_workers()
+      raise RuntimeError(
+          'A worker failed or did not respond within %s seconds.' %
+          self._timeout) from None
+
+  def _get_observations(self):
+    return {key: shared.array.copy() for key, shared in self._shared.items()}
+
+  def _get_infos(self):
+    """Collects the infos sent by the workers after the last command."""
+    infos = {}
+    for index in np.flatnonzero(self._has_info.array):
+      pipe = self._info_pipes[index]
+      if not pipe.poll(self._timeout):
+        raise RuntimeError('Worker %d did not send its info.' % index)
+      infos = self._add_info(infos, pipe.recv(), index)
+    return infos
+
+  def reset_wait(self, seed = None, options = None):
+    """Resets all sub-environments.
+    Args:
+      seed: None, an int (sub-environment i is seeded with seed + i) or a
+        sequence with one seed per sub-environment.
+      options: Unused.
+    Returns:
+      A (observations, infos) tuple.
+    """
+    del options  # Unused.
+    if seed is None:
+      self._has_seed.array[:] = False
+    else:
+      if isinstance(seed, numbers.Integral):
+        seed = [seed + i for i in range(self.num_envs)]
+      self._seeds.array[:] = seed
+      self._has_seed.array[:] = True
+    self._run(_RESET)
+    return self._get_observations(), self._get_infos()
+
+  def step_async(self, actions):
+    self._actions.array[:] = actions
+
+  def step_wait(self):
+    """Returns (observations, rewards, terminated, truncated, infos)."""
+    self._run(_STEP)
+    return (self._get_observations(), self._rewards.array.copy(),
+            self._dones.array.copy(), np.zeros(self.num_envs, dtype=bool),
+            self._get_infos())
+
+  def close_extras(self, **kwargs):
+    del kwargs  # Unused.
+    # Skipped if a worker has died, for the reason given in `_run`; the
+    # remaining workers are terminated below instead.
+    if all(process.is_alive() for process in self._processes):
+      try:
+        self._command.array[0] = _CLOSE
+        self._start.wait(timeout=1)
+      except threading.BrokenBarrierError:
+        pass
+    for process in self._processes:
+      process.join(timeout=1)
+      if process.is_alive():
+        process.terminate()
+    for pipe in self._info_pipes:
+      pipe.close()
+    for shared in list(self._shared.values()) + [
+        self._actions, self._seeds, self._has_seed, self._rewards, self._dones,
+        self._has_info, self._command
+    ]:
+      shared.release()
+
+
+class VecLendingEnv(gym.vector.VectorEnv):
+  """Steps num_envs lending environments in lockstep with numpy.
+  Each sub-environment follows the dynamics of `BaseLendingEnv._step_impl`,
+  but the state of all sub-environments is held in arrays and updated with a
+  few vectorized operations per step. New applicants for every sub-environment
+  are drawn with a single `sample_batch` call.
+  The applicant distribution is shared by all sub-environments and must not
+  change over time, so this supports the dynamics of SimpleLoans and
+  DifferentialExpressionEnv but not DelayedImpactEnv.
+  The reward of each sub-environment is its change in bank_cash. A
+  sub-environment whose bank cash falls below the loan amount is done and is
+  reset in the same step; its final observation is reported in
+  infos['final_observation'].
+  """
+
+  def __init__(self, num_envs, params=None):
+    params = lending_params.Params() if params is None else params
+    super(VecLendingEnv, self).__init__(
+        num_envs,
+        observation_space=spaces.Dict(_observable_state_vars(params)),
+        action_space=spaces.Discrete(2))
+    self.params = params
+    self.rng = np.random.RandomState()
+    self.bank_cash = np.full(num_envs, params.bank_starting_cash,
+                             dtype=np.float64)
+    self.applicant_features = None  # type: Optional[np.ndarray]
+    self.group = None  # type: Optional[np.ndarray]
+    self.will_default = None  # type: Optional[np.ndarray]
+    self._actions = None  # type: Optional[np.ndarray]
+    self._sample_applicants()
+
+  def _sample_applicants(self):
+    """Draws a new applicant for every sub-environment."""
+    params = self.params
+    features, group, will_default = params.applicant_distribution.sample_batch(
+        self.rng, self.num_envs)
+    self.applicant_features = _clip_batch(features, params.min_observation,
+                                          params.max_observation)
+    self.group = group
+    self.will_default = will_default
+
+  def _get_observable_state(self):
+    return {
+        'bank_cash': self.bank_cash.copy(),
+        'applicant_features': self.applicant_features,
+        'group': self.group
+    }
+
+  def seed(self, seed=None):
+    """Sets the seed for the random number generator shared by all envs."""
+    self.rng, seed = seeding.np_random(seed)
+    return [seed]
+
+  def reset_wait(self, seed=None, options=None):
+    """Resets all sub-environments.
+    Args:
+      seed: Optional integer seed for the shared random number generator.
+      options: Unused.
+    Returns:
+      A (observations, infos) tuple.
+    """
+    del options  # Unused.
+    if seed is not None:
+      self.seed(seed)
+    self.bank_cash[:] = self.params.bank_starting_cash
+    self._sample_applicants()
+    return self._get_observable_state(), {}
+
+  def step_async(self, actions):
+    self._actions = np.asarray(actions)
+
+  def step_wait(self):
+    """Runs one timestep of every sub-environment.
+    Returns:
+      A (observations, rewards, terminated, truncated, infos) tuple of batches.
+    """
+    params = self.params
+    accept = self._actions == LoanDecision.ACCEPT
+    default = accept & self.will_default
+    repay = accept & ~self.will_default
+    rewards = np.where(
+        default, -params.loan_amount,
+        np.where(repay, params.loan_amount * params.interest_rate, 0.))
+    self.bank_cash += rewards
+    terminated = self.bank_cash < params.loan_amount
+
+    infos = {}
+    if terminated.any():
+      final_observation = np.full(self.num_envs, None, dtype=object)
+      for i in np.flatnonzero(terminated):
+        final_observation[i] = {
+            'bank_cash': np.array(self.bank_cash[i]),
+            'applicant_features': self.applicant_features[i],
+            'group': self.group[i]
+        }
+      infos['final_observation'] = final_observation
+      infos['_final_observation'] = terminated.copy()
+      self.bank_cash[terminated] = params.bank_starting_cash
+
+    self._sample_applicants()
+    return (self._get_observable_state(), rewards, terminated,
+            np.zeros(self.num_envs, dtype=bool), infos)